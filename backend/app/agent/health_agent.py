@@ -1,8 +1,19 @@
 import os
+import re
+import math
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-from pinai_agent_sdk import PINAIAgentSDK, AGENT_CATEGORY_DAILY
-import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
+from operator import itemgetter
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Any, Callable, ClassVar, Final, FrozenSet, List, Mapping, Optional, Tuple
+import orjson
+
+if TYPE_CHECKING:
+    from pinai_agent_sdk import PINAIAgentSDK
 
 # Configure logging
 logging.basicConfig(
@@ -11,37 +22,330 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Intent keywords, in priority order. When a message mentions several intents
+# the first bucket listed here wins, matching the original if/elif order.
+INTENT_KEYWORDS = (
+    ("blood", ("blood test", "blood work")),
+    ("vitals", ("vital", "blood pressure")),
+    ("reco", ("recommend", "advice", "suggestion")),
+    ("overview", ("health status", "health overview", "my health")),
+)
+_INTENT_PRIORITY = {intent: priority for priority, (intent, _) in enumerate(INTENT_KEYWORDS)}
+
+# All intent keywords compiled into one case-insensitive pattern, with a named
+# group per intent, so a message is scanned once instead of once per keyword
+_INTENT_PATTERN = re.compile(
+    "|".join(
+        f"(?P<{intent}>{'|'.join(re.escape(term) for term in terms)})"
+        for intent, terms in INTENT_KEYWORDS
+    ),
+    re.IGNORECASE,
+)
+
+# Static report text, built once at import and appended by reference
+_DEFAULT_FALLBACK: Final[str] = (
+    "I'm your Health AI Assistant. I can help analyze your blood tests, vital signs, "
+    "and provide health recommendations. What would you like to know about your health?"
+)
+
+_INSIGHT_GLUCOSE_ELEVATED: Final[str] = (
+    "\nYour glucose level is elevated. This may indicate prediabetes or "
+    "could be due to recent food intake before the test. Consider follow-up testing "
+    "and consulting with your doctor about lifestyle modifications like diet changes "
+    "and increased physical activity."
+)
+_INSIGHT_CHOLESTEROL_TOTAL_ELEVATED: Final[str] = (
+    "\nYour total cholesterol is elevated. This increases risk for heart disease "
+    "and stroke. Consider dietary changes (reducing saturated fats), regular exercise, "
+    "and possibly medication if recommended by your doctor."
+)
+_INSIGHT_CHOLESTEROL_LDL_ELEVATED: Final[str] = (
+    "\nYour LDL ('bad') cholesterol is elevated. This can lead to plaque buildup "
+    "in your arteries. Consider reducing saturated and trans fats in your diet, "
+    "increasing fiber intake, and regular exercise."
+)
+_INSIGHT_TRIGLYCERIDES_ELEVATED: Final[str] = (
+    "\nYour triglyceride levels are elevated. This may increase risk of heart disease. "
+    "Consider limiting added sugars and simple carbohydrates, reducing alcohol intake, "
+    "and increasing physical activity."
+)
+_INSIGHT_VITAMIN_D_DEFICIENT: Final[str] = (
+    "\nYou have vitamin D deficiency. This can affect bone health and immune function. "
+    "Consider more sun exposure (safely), vitamin D-rich foods like fatty fish, "
+    "and supplements as recommended by your doctor."
+)
+
+# Insight text for abnormal blood test results, keyed by (test name, status)
+_INSIGHTS: Final[Dict[Tuple[str, str], str]] = {
+    ("glucose", "elevated"): _INSIGHT_GLUCOSE_ELEVATED,
+    ("cholesterolTotal", "elevated"): _INSIGHT_CHOLESTEROL_TOTAL_ELEVATED,
+    ("cholesterolLDL", "elevated"): _INSIGHT_CHOLESTEROL_LDL_ELEVATED,
+    ("triglycerides", "elevated"): _INSIGHT_TRIGLYCERIDES_ELEVATED,
+    ("vitaminD", "deficient"): _INSIGHT_VITAMIN_D_DEFICIENT,
+}
+_NORMAL_STATUSES: Final[FrozenSet[Optional[str]]] = frozenset({"normal"})
+
+_INSIGHT_BLOOD_PRESSURE_ELEVATED: Final[str] = (
+    "Your blood pressure is elevated. This may increase risk for heart disease and stroke. "
+    "Consider reducing sodium intake, regular exercise, stress management, "
+    "and maintaining a healthy weight.\n\n"
+)
+_REC_GLUCOSE: Final[str] = (
+    "1. Blood Sugar Management:\n"
+    "   - Limit added sugars and refined carbohydrates\n"
+    "   - Increase fiber intake with whole grains, vegetables, and legumes\n"
+    "   - Regular physical activity (aim for 150 minutes per week)\n"
+    "   - Consider speaking with a healthcare provider about diabetes screening\n\n"
+)
+_REC_CHOLESTEROL: Final[str] = (
+    "2. Cholesterol Management:\n"
+    "   - Reduce saturated and trans fats (limit red meat, full-fat dairy)\n"
+    "   - Increase heart-healthy fats (olive oil, avocados, nuts)\n"
+    "   - Add more soluble fiber (oats, beans, fruits)\n"
+    "   - Regular physical activity\n"
+    "   - Consider plant sterols/stanols if recommended\n\n"
+)
+_REC_VITAMIN_D: Final[str] = (
+    "3. Vitamin D Improvement:\n"
+    "   - Safe sun exposure (15-30 minutes several times weekly)\n"
+    "   - Consume vitamin D-rich foods (fatty fish, fortified milk, egg yolks)\n"
+    "   - Consider a vitamin D supplement (1000-2000 IU daily)\n\n"
+)
+_REC_BLOOD_PRESSURE: Final[str] = (
+    "4. Blood Pressure Management:\n"
+    "   - Reduce sodium intake (<2300mg daily)\n"
+    "   - DASH diet (rich in fruits, vegetables, whole grains, lean proteins)\n"
+    "   - Regular physical activity\n"
+    "   - Limit alcohol consumption\n"
+    "   - Stress management techniques\n\n"
+)
+_REC_SLEEP: Final[str] = (
+    "5. Sleep Improvement:\n"
+    "   - Aim for 7-9 hours of sleep nightly\n"
+    "   - Maintain a consistent sleep schedule\n"
+    "   - Create a restful environment (dark, quiet, comfortable)\n"
+    "   - Limit screen time before bed\n"
+    "   - Avoid caffeine and large meals before bedtime\n\n"
+)
+_REC_GENERAL: Final[str] = (
+    "General Health Maintenance:\n"
+    "   - Stay hydrated (aim for 2-3 liters of water daily)\n"
+    "   - Balanced diet rich in whole foods\n"
+    "   - Regular physical activity (150+ minutes moderate activity weekly)\n"
+    "   - Stress management (meditation, deep breathing, hobbies)\n"
+    "   - Regular health check-ups and screenings\n"
+)
+
+# Lipid panel results that trigger the cholesterol recommendations
+_CHOL_KEYS: Final[Tuple[str, ...]] = ("cholesterolTotal", "cholesterolLDL", "triglycerides")
+
+# Blood test results whose status drives the recommendations
+_RECOMMENDATION_KEYS: Final[Tuple[str, ...]] = ("glucose", *_CHOL_KEYS, "vitaminD")
+
+# Recommendation sections triggered by the latest blood test results, in
+# report order, as (predicate over result statuses, section text) pairs
+_BLOOD_TEST_RECOMMENDATIONS: Final[Tuple[Tuple[Callable[[Dict[str, Optional[str]]], bool], str], ...]] = (
+    (lambda statuses: statuses["glucose"] == "elevated", _REC_GLUCOSE),
+    (lambda statuses: any(statuses[key] == "elevated" for key in _CHOL_KEYS), _REC_CHOLESTEROL),
+    (lambda statuses: statuses["vitaminD"] == "deficient", _REC_VITAMIN_D),
+)
+
+# Shared read-only default for .get() on missing nested records; list fields
+# default to () for the same reason
+_EMPTY: Final[Mapping[str, Any]] = MappingProxyType({})
+
+# Reads totalHours from a sleepData entry without a Python-level loop body
+_TOTAL_HOURS = itemgetter("totalHours")
+
+# Seconds to wait for the PinAI SDK to answer a chat message
+_DEFAULT_SEND_TIMEOUT: Final[float] = 5.0
+
+# Threads available for SDK sends. A send that outlives its timeout keeps its
+# thread, so sends get their own pool rather than asyncio's default executor.
+_SEND_WORKERS: Final[int] = 4
+
+def _read_send_timeout() -> float:
+    """Read PINAI_SEND_TIMEOUT, falling back to the default if it is not a positive number."""
+    value = os.getenv("PINAI_SEND_TIMEOUT")
+    if value is None:
+        return _DEFAULT_SEND_TIMEOUT
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = math.nan
+    if not (math.isfinite(timeout) and timeout > 0):
+        logger.warning("Invalid PINAI_SEND_TIMEOUT %r, using %.1fs", value, _DEFAULT_SEND_TIMEOUT)
+        return _DEFAULT_SEND_TIMEOUT
+    return timeout
+
+# Where the registered agent ID is kept between runs, so a restart reuses the
+# agent instead of trying to register the same name again. The file also holds
+# a fingerprint of the API key the agent was registered with.
+AGENT_ID_PATH = os.getenv(
+    "PINAI_AGENT_ID_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "healthai", "agent_id"),
+)
+
+def _api_key_fingerprint(api_key: str) -> str:
+    """Short, non-reversible tag identifying an API key."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+def _load_agent_id(api_key: str) -> Optional[str]:
+    """Read the agent ID persisted by a previous run, if it was saved under this API key."""
+    try:
+        with open(AGENT_ID_PATH, "r") as file:
+            fingerprint, _, agent_id = file.read().strip().partition("\n")
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning("Could not read agent ID from %s: %s", AGENT_ID_PATH, e)
+        return None
+    
+    if fingerprint != _api_key_fingerprint(api_key):
+        logger.info("Ignoring agent ID in %s saved for a different API key", AGENT_ID_PATH)
+        return None
+    return agent_id.strip() or None
+
+def _save_agent_id(api_key: str, agent_id: Any) -> None:
+    """Persist the agent ID, tagged with its API key, for future runs."""
+    try:
+        os.makedirs(os.path.dirname(AGENT_ID_PATH), exist_ok=True)
+        with open(AGENT_ID_PATH, "w") as file:
+            file.write(f"{_api_key_fingerprint(api_key)}\n{agent_id}")
+    except OSError as e:
+        logger.warning("Could not save agent ID to %s: %s", AGENT_ID_PATH, e)
+
+def _record_date(record: Dict[str, Any]) -> str:
+    """Sort key for dated records; ISO dates order correctly as strings."""
+    return record.get("date") or ""
+
+class _HealthDataView:
+    """
+    Derived values of one health data snapshot, shared by all analyzers.
+    Each value is computed on first access and reused afterwards.
+    """
+    
+    def __init__(self, health_data: Dict[str, Any]):
+        self.health_data = health_data
+    
+    @cached_property
+    def latest_blood_test(self) -> Optional[Dict[str, Any]]:
+        """Most recent blood test, or None if there are none."""
+        blood_tests = self.health_data.get("bloodTests", ())
+        return max(blood_tests, key=_record_date) if blood_tests else None
+    
+    @cached_property
+    def abnormal_results(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(test name, result) pairs from the latest blood test that are not normal."""
+        return [
+            (test_name, test_data)
+            for test_name, test_data in self.latest_blood_test["results"].items()
+            if test_data.get("status") not in _NORMAL_STATUSES
+        ]
+    
+    @cached_property
+    def result_statuses(self) -> Dict[str, Optional[str]]:
+        """Statuses of the latest blood test results used for recommendations."""
+        results = self.latest_blood_test.get("results", _EMPTY)
+        return {key: results.get(key, _EMPTY).get("status") for key in _RECOMMENDATION_KEYS}
+    
+    @cached_property
+    def latest_vitals(self) -> Optional[Dict[str, Any]]:
+        """Most recent vital sign measurement, or None if there are none."""
+        vitals = self.health_data.get("vitals", ())
+        return max(vitals, key=_record_date) if vitals else None
+    
+    @cached_property
+    def bp_status(self) -> Optional[str]:
+        """Blood pressure status from the latest vitals."""
+        return self.latest_vitals.get("bloodPressure", _EMPTY).get("status")
+    
+    @cached_property
+    def avg_sleep_hours(self) -> Optional[float]:
+        """Average nightly sleep, or None if there is no sleep data."""
+        sleep_data = self.health_data.get("healthMetrics", _EMPTY).get("sleepData", ())
+        if not sleep_data:
+            return None
+        return sum(map(_TOTAL_HOURS, sleep_data)) / len(sleep_data)
+
 class HealthAIAgent:
     """
     Health AI Agent using the PinAI SDK to provide health insights and recommendations
     based on user's personal health data.
     """
     
+    __slots__ = (
+        "api_key",
+        "agent_id",
+        "send_timeout",
+        "sdk_client",
+        "sessions",
+        "_max_sessions",
+        "_intent_handlers",
+    )
+    
+    # Configuration and SDK client shared by every agent in the process, filled
+    # in by the first instance so later ones skip the env lookups and setup
+    _cached_api_key: ClassVar[Optional[str]] = None
+    _cached_agent_id: ClassVar[Optional[str]] = None
+    _cached_send_timeout: ClassVar[float] = _DEFAULT_SEND_TIMEOUT
+    _cached_sdk_client: ClassVar[Optional["PINAIAgentSDK"]] = None
+    _send_executor: ClassVar[Optional[ThreadPoolExecutor]] = None
+    # None until the listener start has been attempted; False if it could not start
+    _sdk_started: ClassVar[Optional[bool]] = None
+    
     def __init__(self):
         """Initialize the Health AI Agent with PinAI SDK."""
+        cls = type(self)
+        
         # Get API key from environment variable
-        self.api_key = os.getenv("PINAI_API_KEY", "")
-        self.agent_id = os.getenv("PINAI_AGENT_ID", None)
+        if cls._cached_api_key is None:
+            cls._cached_api_key = os.getenv("PINAI_API_KEY", "")
+            cls._cached_agent_id = os.getenv("PINAI_AGENT_ID", None) or _load_agent_id(cls._cached_api_key)
+            cls._cached_send_timeout = _read_send_timeout()
+        self.api_key = cls._cached_api_key
+        self.agent_id = cls._cached_agent_id
+        self.send_timeout = cls._cached_send_timeout
         
         if not self.api_key:
             logger.warning("PINAI_API_KEY environment variable not set. Some features may not work.")
         
         # Initialize the PinAI SDK client
-        self.sdk_client = self._initialize_sdk_client()
+        if cls._cached_sdk_client is None:
+            cls._cached_sdk_client = self._initialize_sdk_client()
+        self.sdk_client = cls._cached_sdk_client
         
         # Register agent if no agent_id is available
         if not self.agent_id:
             self._register_agent()
         
-        # Store sessions and health data mapping
-        self.sessions = {}
+        # Start listening for agent messages once, rather than on every chat message
+        if self.sdk_client and self.agent_id and cls._sdk_started is None:
+            self._start_agent()
+        if cls._sdk_started and cls._send_executor is None:
+            cls._send_executor = ThreadPoolExecutor(max_workers=_SEND_WORKERS, thread_name_prefix="pinai-send")
+        
+        # Store sessions and health data mapping, least recently used first
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_sessions = 10_000
+        
+        # Intent name -> analyzer, bound once per agent
+        self._intent_handlers = {
+            "blood": self._analyze_blood_test,
+            "vitals": self._analyze_vitals,
+            "reco": self._generate_health_recommendations,
+            "overview": self._generate_health_overview,
+        }
     
-    def _initialize_sdk_client(self) -> PINAIAgentSDK:
+    def _initialize_sdk_client(self) -> Optional["PINAIAgentSDK"]:
         """Initialize the PinAI SDK client."""
         try:
+            # Imported here so importing this module does not pull in the SDK
+            from pinai_agent_sdk import PINAIAgentSDK
+            
             return PINAIAgentSDK(api_key=self.api_key)
         except Exception as e:
-            logger.error(f"Failed to initialize PinAI SDK client: {e}")
+            logger.error("Failed to initialize PinAI SDK client: %s", e)
             # Create a dummy client for development if API key is missing
             return None
     
@@ -52,6 +356,8 @@ class HealthAIAgent:
             return
         
         try:
+            from pinai_agent_sdk import AGENT_CATEGORY_DAILY
+            
             agent_info = self.sdk_client.register_agent(
                 name="Health AI Assistant",
                 description="Personal health assistant that analyzes your health data and provides insights and recommendations",
@@ -59,217 +365,187 @@ class HealthAIAgent:
             )
             
             self.agent_id = agent_info.get("id")
-            logger.info(f"Registered Health AI Agent with ID: {self.agent_id}")
+            logger.info("Registered Health AI Agent with ID: %s", self.agent_id)
             
-            # Save agent_id for future use
-            os.environ["PINAI_AGENT_ID"] = str(self.agent_id)
+            # Save agent_id for future agents in this process and future runs
+            type(self)._cached_agent_id = self.agent_id
+            if self.agent_id is not None:
+                _save_agent_id(self.api_key, self.agent_id)
         except Exception as e:
-            logger.error(f"Failed to register agent: {e}")
+            logger.error("Failed to register agent: %s", e)
     
-    def _analyze_blood_test(self, blood_tests: List[Dict[str, Any]]) -> str:
+    def _start_agent(self) -> None:
+        """Start the PinAI agent listener (non-blocking)."""
+        cls = type(self)
+        start = getattr(self.sdk_client, "start", None)
+        if start is None:
+            # pinai-agent-sdk 0.1.23 only ships the blocking start_and_run(), so
+            # chat messages are answered locally until a non-blocking start exists
+            logger.warning("PinAI SDK has no non-blocking start(); forwarding chat messages to the agent is disabled")
+            cls._sdk_started = False
+            return
+        
+        try:
+            start(
+                on_message_callback=self._handle_message,
+                agent_id=self.agent_id
+            )
+            cls._sdk_started = True
+        except Exception as e:
+            logger.error("Failed to start agent: %s", e)
+            cls._sdk_started = False
+    
+    def _handle_message(self, agent_message: Dict[str, Any]) -> str:
+        """Process an incoming message from the PinAI agent."""
+        return f"Based on your health data: {agent_message['content']}"
+    
+    def _analyze_blood_test(self, view: _HealthDataView) -> str:
         """
         Analyze blood test results to identify abnormal values and provide insights.
         
         Args:
-            blood_tests: List of blood test results
+            view: Derived view of the user's health data
             
         Returns:
             str: Analysis of blood test results
         """
-        if not blood_tests or len(blood_tests) == 0:
+        latest_test = view.latest_blood_test
+        if latest_test is None:
             return "No blood test data available for analysis."
         
-        # Get most recent blood test
-        latest_test = blood_tests[0]
-        
-        # Find abnormal results
-        abnormal_results = []
-        for test_name, test_data in latest_test["results"].items():
-            if test_data.get("status") != "normal":
-                abnormal_results.append({
-                    "name": test_name,
-                    "value": test_data["value"],
-                    "unit": test_data["unit"],
-                    "normal_range": test_data["normalRange"],
-                    "status": test_data["status"]
-                })
+        abnormal_results = view.abnormal_results
         
         # Generate analysis
-        analysis = f"Blood Test Analysis (from {latest_test['date']}):\n\n"
+        out = [f"Blood Test Analysis (from {latest_test['date']}):\n\n"]
         
         if not abnormal_results:
-            analysis += "All test results are within normal ranges. Your blood work looks healthy!"
+            out.append("All test results are within normal ranges. Your blood work looks healthy!")
         else:
-            analysis += f"Found {len(abnormal_results)} test result(s) outside normal ranges:\n\n"
-            
-            for result in abnormal_results:
-                analysis += f"- {result['name']}: {result['value']} {result['unit']} "
-                analysis += f"(Normal range: {result['normal_range']}, Status: {result['status']})\n"
+            out.append(f"Found {len(abnormal_results)} test result(s) outside normal ranges:\n\n")
             
-            # Add specific insights for common abnormal results
-            for result in abnormal_results:
-                if result["name"] == "glucose" and result["status"] == "elevated":
-                    analysis += "\nYour glucose level is elevated. This may indicate prediabetes or "
-                    analysis += "could be due to recent food intake before the test. Consider follow-up testing "
-                    analysis += "and consulting with your doctor about lifestyle modifications like diet changes "
-                    analysis += "and increased physical activity."
-                
-                elif result["name"] == "cholesterolTotal" and result["status"] == "elevated":
-                    analysis += "\nYour total cholesterol is elevated. This increases risk for heart disease "
-                    analysis += "and stroke. Consider dietary changes (reducing saturated fats), regular exercise, "
-                    analysis += "and possibly medication if recommended by your doctor."
+            insights = []
+            for test_name, test_data in abnormal_results:
+                status = test_data["status"]
+                out.append(f"- {test_name}: {test_data['value']} {test_data['unit']} ")
+                out.append(f"(Normal range: {test_data['normalRange']}, Status: {status})\n")
                 
-                elif result["name"] == "cholesterolLDL" and result["status"] == "elevated":
-                    analysis += "\nYour LDL ('bad') cholesterol is elevated. This can lead to plaque buildup "
-                    analysis += "in your arteries. Consider reducing saturated and trans fats in your diet, "
-                    analysis += "increasing fiber intake, and regular exercise."
-                
-                elif result["name"] == "triglycerides" and result["status"] == "elevated":
-                    analysis += "\nYour triglyceride levels are elevated. This may increase risk of heart disease. "
-                    analysis += "Consider limiting added sugars and simple carbohydrates, reducing alcohol intake, "
-                    analysis += "and increasing physical activity."
-                
-                elif result["name"] == "vitaminD" and result["status"] == "deficient":
-                    analysis += "\nYou have vitamin D deficiency. This can affect bone health and immune function. "
-                    analysis += "Consider more sun exposure (safely), vitamin D-rich foods like fatty fish, "
-                    analysis += "and supplements as recommended by your doctor."
+                # Collect specific insights for common abnormal results
+                insight = _INSIGHTS.get((test_name, status))
+                if insight:
+                    insights.append(insight)
+            
+            out.extend(insights)
         
-        return analysis
+        return "".join(out)
     
-    def _analyze_vitals(self, vitals: List[Dict[str, Any]]) -> str:
+    def _analyze_vitals(self, view: _HealthDataView) -> str:
         """
         Analyze vital signs to provide insights.
         
         Args:
-            vitals: List of vital sign measurements
+            view: Derived view of the user's health data
             
         Returns:
             str: Analysis of vital signs
         """
-        if not vitals or len(vitals) == 0:
+        latest_vitals = view.latest_vitals
+        if latest_vitals is None:
             return "No vital sign data available for analysis."
         
-        # Get most recent vitals
-        latest_vitals = vitals[0]
-        
         # Generate analysis
-        analysis = f"Vital Signs Analysis (from {latest_vitals['date']}):\n\n"
+        out = [f"Vital Signs Analysis (from {latest_vitals['date']}):\n\n"]
         
         # Blood pressure analysis
         bp = latest_vitals["bloodPressure"]
-        analysis += f"Blood Pressure: {bp['systolic']}/{bp['diastolic']} mmHg ({bp['status']})\n"
+        bp_status = bp["status"]
+        out.append(f"Blood Pressure: {bp['systolic']}/{bp['diastolic']} mmHg ({bp_status})\n")
         
-        if bp['status'] == "elevated":
-            analysis += "Your blood pressure is elevated. This may increase risk for heart disease and stroke. "
-            analysis += "Consider reducing sodium intake, regular exercise, stress management, "
-            analysis += "and maintaining a healthy weight.\n\n"
+        if bp_status == "elevated":
+            out.append(_INSIGHT_BLOOD_PRESSURE_ELEVATED)
         else:
-            analysis += "Your blood pressure is within normal range.\n\n"
+            out.append("Your blood pressure is within normal range.\n\n")
         
         # Heart rate analysis
         hr = latest_vitals["heartRate"]
-        analysis += f"Heart Rate: {hr['value']} {hr['unit']} ({hr['status']})\n"
+        out.append(f"Heart Rate: {hr['value']} {hr['unit']} ({hr['status']})\n")
         
         # Oxygen saturation analysis
         ox = latest_vitals["oxygenSaturation"]
-        analysis += f"Oxygen Saturation: {ox['value']}{ox['unit']} ({ox['status']})\n"
+        out.append(f"Oxygen Saturation: {ox['value']}{ox['unit']} ({ox['status']})\n")
         
         # Temperature analysis
         temp = latest_vitals["temperature"]
-        analysis += f"Body Temperature: {temp['value']} {temp['unit']} ({temp['status']})\n"
+        out.append(f"Body Temperature: {temp['value']} {temp['unit']} ({temp['status']})\n")
         
-        return analysis
+        return "".join(out)
     
-    def _generate_health_recommendations(self, health_data: Dict[str, Any]) -> str:
+    def _generate_health_recommendations(self, view: _HealthDataView) -> str:
         """
         Generate personalized health recommendations based on user's health data.
         
         Args:
-            health_data: User's health data
+            view: Derived view of the user's health data
             
         Returns:
             str: Personalized health recommendations
         """
-        recommendations = "Personalized Health Recommendations:\n\n"
+        out = ["Personalized Health Recommendations:\n\n"]
         
         # Check blood tests for recommendations
-        blood_tests = health_data.get("bloodTests", [])
-        if blood_tests and len(blood_tests) > 0:
-            latest_test = blood_tests[0]
-            results = latest_test.get("results", {})
-            
-            # Glucose recommendations
-            glucose = results.get("glucose", {})
-            if glucose.get("status") == "elevated":
-                recommendations += "1. Blood Sugar Management:\n"
-                recommendations += "   - Limit added sugars and refined carbohydrates\n"
-                recommendations += "   - Increase fiber intake with whole grains, vegetables, and legumes\n"
-                recommendations += "   - Regular physical activity (aim for 150 minutes per week)\n"
-                recommendations += "   - Consider speaking with a healthcare provider about diabetes screening\n\n"
-            
-            # Cholesterol recommendations
-            chol_total = results.get("cholesterolTotal", {})
-            chol_ldl = results.get("cholesterolLDL", {})
-            triglycerides = results.get("triglycerides", {})
-            
-            if (chol_total.get("status") == "elevated" or 
-                chol_ldl.get("status") == "elevated" or 
-                triglycerides.get("status") == "elevated"):
-                recommendations += "2. Cholesterol Management:\n"
-                recommendations += "   - Reduce saturated and trans fats (limit red meat, full-fat dairy)\n"
-                recommendations += "   - Increase heart-healthy fats (olive oil, avocados, nuts)\n"
-                recommendations += "   - Add more soluble fiber (oats, beans, fruits)\n"
-                recommendations += "   - Regular physical activity\n"
-                recommendations += "   - Consider plant sterols/stanols if recommended\n\n"
-            
-            # Vitamin D recommendations
-            vit_d = results.get("vitaminD", {})
-            if vit_d.get("status") == "deficient":
-                recommendations += "3. Vitamin D Improvement:\n"
-                recommendations += "   - Safe sun exposure (15-30 minutes several times weekly)\n"
-                recommendations += "   - Consume vitamin D-rich foods (fatty fish, fortified milk, egg yolks)\n"
-                recommendations += "   - Consider a vitamin D supplement (1000-2000 IU daily)\n\n"
+        if view.latest_blood_test is not None:
+            statuses = view.result_statuses
+            for applies, recommendation in _BLOOD_TEST_RECOMMENDATIONS:
+                if applies(statuses):
+                    out.append(recommendation)
         
         # Check vitals for recommendations
-        vitals = health_data.get("vitals", [])
-        if vitals and len(vitals) > 0:
-            latest_vitals = vitals[0]
-            bp = latest_vitals.get("bloodPressure", {})
-            
-            if bp.get("status") == "elevated":
-                recommendations += "4. Blood Pressure Management:\n"
-                recommendations += "   - Reduce sodium intake (<2300mg daily)\n"
-                recommendations += "   - DASH diet (rich in fruits, vegetables, whole grains, lean proteins)\n"
-                recommendations += "   - Regular physical activity\n"
-                recommendations += "   - Limit alcohol consumption\n"
-                recommendations += "   - Stress management techniques\n\n"
-        
-        # Check health metrics for recommendations
-        metrics = health_data.get("healthMetrics", {})
+        if view.latest_vitals is not None and view.bp_status == "elevated":
+            out.append(_REC_BLOOD_PRESSURE)
         
         # Sleep recommendations
-        sleep_data = metrics.get("sleepData", [])
-        if sleep_data and len(sleep_data) > 0:
-            avg_hours = sum(day["totalHours"] for day in sleep_data) / len(sleep_data)
-            if avg_hours < 7:
-                recommendations += "5. Sleep Improvement:\n"
-                recommendations += "   - Aim for 7-9 hours of sleep nightly\n"
-                recommendations += "   - Maintain a consistent sleep schedule\n"
-                recommendations += "   - Create a restful environment (dark, quiet, comfortable)\n"
-                recommendations += "   - Limit screen time before bed\n"
-                recommendations += "   - Avoid caffeine and large meals before bedtime\n\n"
+        avg_hours = view.avg_sleep_hours
+        if avg_hours is not None and avg_hours < 7:
+            out.append(_REC_SLEEP)
         
         # General recommendations
-        recommendations += "General Health Maintenance:\n"
-        recommendations += "   - Stay hydrated (aim for 2-3 liters of water daily)\n"
-        recommendations += "   - Balanced diet rich in whole foods\n"
-        recommendations += "   - Regular physical activity (150+ minutes moderate activity weekly)\n"
-        recommendations += "   - Stress management (meditation, deep breathing, hobbies)\n"
-        recommendations += "   - Regular health check-ups and screenings\n"
-        
-        return recommendations
+        out.append(_REC_GENERAL)
+        
+        return "".join(out)
     
-    def process_message(self, message: str, health_data: Dict[str, Any], session_id: str) -> str:
+    def _generate_health_overview(self, view: _HealthDataView) -> str:
+        """
+        Combine the blood test and vital sign analyses into a single overview.
+        
+        Args:
+            view: Derived view of the user's health data
+            
+        Returns:
+            str: Health overview
+        """
+        blood_analysis = self._analyze_blood_test(view)
+        vitals_analysis = self._analyze_vitals(view)
+        return f"Health Overview:\n\n{blood_analysis}\n\n{vitals_analysis}"
+    
+    def _match_intent(self, message: str) -> Optional[str]:
+        """
+        Find the highest-priority intent mentioned in a message.
+        
+        Args:
+            message: User's message
+            
+        Returns:
+            Optional[str]: Intent name, or None if no keyword matched
+        """
+        best = None
+        for match in _INTENT_PATTERN.finditer(message):
+            intent = match.lastgroup
+            if best is None or _INTENT_PRIORITY[intent] < _INTENT_PRIORITY[best]:
+                best = intent
+                if _INTENT_PRIORITY[best] == 0:
+                    break
+        return best
+    
+    async def process_message(self, message: str, health_data: Dict[str, Any], session_id: str) -> str:
         """
         Process a message from the user and generate a response using the health data.
         
@@ -281,66 +557,64 @@ class HealthAIAgent:
         Returns:
             str: Response to the user's message
         """
-        # Store health data for the session
-        self.sessions[session_id] = {
-            "health_data": health_data
-        }
+        # Store health data for the session, keeping cached derived values
+        # while the same health data object keeps arriving
+        session = self.sessions.get(session_id)
+        if session is None or session["health_data"] is not health_data:
+            session = self.sessions[session_id] = {
+                "health_data": health_data,
+                "health_context": None,
+                "view": _HealthDataView(health_data),
+                # Generated analyses keyed by intent, so multi-turn chats over
+                # the same data reuse them
+                "analyses": {},
+            }
+        self.sessions.move_to_end(session_id)
+        if len(self.sessions) > self._max_sessions:
+            self.sessions.popitem(last=False)
         
         # Check message intent and generate appropriate response
-        message_lower = message.lower()
-        
-        # Check if message is about blood tests
-        if "blood test" in message_lower or "blood work" in message_lower:
-            return self._analyze_blood_test(health_data.get("bloodTests", []))
-        
-        # Check if message is about vital signs
-        elif "vital" in message_lower or "blood pressure" in message_lower:
-            return self._analyze_vitals(health_data.get("vitals", []))
-        
-        # Check if message is asking for recommendations
-        elif "recommend" in message_lower or "advice" in message_lower or "suggestion" in message_lower:
-            return self._generate_health_recommendations(health_data)
-        
-        # Check if message is about overall health status
-        elif "health status" in message_lower or "health overview" in message_lower or "my health" in message_lower:
-            blood_analysis = self._analyze_blood_test(health_data.get("bloodTests", []))
-            vitals_analysis = self._analyze_vitals(health_data.get("vitals", []))
-            return f"Health Overview:\n\n{blood_analysis}\n\n{vitals_analysis}"
-        
-        # If we have the PinAI SDK client, try to use it for other messages
-        elif self.sdk_client and self.agent_id:
+        intent = self._match_intent(message)
+        if intent:
+            analyses = session["analyses"]
+            if intent not in analyses:
+                analyses[intent] = self._intent_handlers[intent](session["view"])
+            return analyses[intent]
+        
+        # If we have a started PinAI SDK client, try to use it for other messages
+        if self.sdk_client and self.agent_id and type(self)._sdk_started:
             try:
                 # Convert health data to a format usable by the agent
-                health_context = json.dumps(health_data)
-                
-                # Use the PinAI SDK to generate a response (actual implementation would depend on API details)
-                def handle_message(agent_message):
-                    # Process the incoming message from the agent
-                    return f"Based on your health data: {agent_message['content']}"
+                if session["health_context"] is None:
+                    session["health_context"] = orjson.dumps(health_data).decode()
+                health_context = session["health_context"]
                 
-                # Start the agent (non-blocking to avoid hanging)
-                self.sdk_client.start(
-                    on_message_callback=handle_message,
-                    agent_id=self.agent_id
-                )
-                
-                # Send message to agent
-                response = self.sdk_client.send_message(
+                # Send message to agent (the listener was started in __init__),
+                # giving up after send_timeout so a slow SDK call cannot stall the request
+                send = partial(
+                    self.sdk_client.send_message,
                     content=message,
                     session_id=session_id,
                     meta_data={"health_data": health_context}
                 )
+                response = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(type(self)._send_executor, send),
+                    timeout=self.send_timeout,
+                )
                 
                 # If we couldn't get a response from the agent, use fallback
                 if not response:
-                    return "I'm your Health AI Assistant. I can help analyze your blood tests, vital signs, and provide health recommendations. What would you like to know about your health?"
+                    return _DEFAULT_FALLBACK
                 
                 return response
+            except asyncio.TimeoutError:
+                logger.warning("PinAI SDK did not respond within %.1fs, using fallback response", self.send_timeout)
+                return _DEFAULT_FALLBACK
             except Exception as e:
-                logger.error(f"Error using PinAI SDK: {e}")
+                logger.error("Error using PinAI SDK: %s", e)
                 # Fall back to default response
-                return "I'm your Health AI Assistant. I can help analyze your blood tests, vital signs, and provide health recommendations. What would you like to know about your health?"
+                return _DEFAULT_FALLBACK
         
         # Default response
         else:
-            return "I'm your Health AI Assistant. I can help analyze your blood tests, vital signs, and provide health recommendations. What would you like to know about your health?" 
\ No newline at end of file
+            return _DEFAULT_FALLBACK 
\ No newline at end of file
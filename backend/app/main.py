@@ -1,12 +1,19 @@
 import os
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from dotenv import load_dotenv
-import json
-from typing import Dict, Any, List, Optional
+import orjson
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
 import logging
 
+if TYPE_CHECKING:
+    from app.agent.health_agent import HealthAIAgent
+
 # Load environment variables
 load_dotenv()
 
@@ -17,11 +24,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse the health data up front so the first request doesn't pay for it
+    try:
+        load_health_data()
+    except HTTPException:
+        pass  # Already logged; requests will report the failure
+    yield
+
 # Initialize the FastAPI app
 app = FastAPI(
     title="Health AI Agent API",
     description="API for Health AI Agent using PinAI SDK",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -33,18 +51,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses such as the blood test and metrics payloads
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # Health data path
 HEALTH_DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "sample_health_data.json")
 
+# Parsed health data, reloaded only when the file's modification time changes
+_health_data_cache: Optional[Dict[str, Any]] = None
+_health_data_mtime: Optional[float] = None
+# Serialized JSON for each top-level section, dropped whenever the data reloads
+_health_section_json: Dict[str, bytes] = {}
+
 # Load health data
 def load_health_data() -> Dict[str, Any]:
+    global _health_data_cache, _health_data_mtime
     try:
-        with open(HEALTH_DATA_PATH, "r") as file:
-            return json.load(file)
+        mtime = os.path.getmtime(HEALTH_DATA_PATH)
+        if _health_data_cache is None or mtime != _health_data_mtime:
+            with open(HEALTH_DATA_PATH, "rb") as file:
+                _health_data_cache = orjson.loads(file.read())
+            _health_data_mtime = mtime
+            _health_section_json.clear()
+        return _health_data_cache
     except Exception as e:
-        logger.error(f"Error loading health data: {e}")
+        logger.error("Error loading health data: %s", e)
         raise HTTPException(status_code=500, detail="Failed to load health data")
 
+def health_section_response(section: str) -> Response:
+    """Return one section of the health data as pre-serialized JSON."""
+    health_data = load_health_data()
+    content = _health_section_json.get(section)
+    if content is None:
+        content = _health_section_json[section] = orjson.dumps(health_data[section])
+    return Response(content=content, media_type="application/json")
+
 # Routes
 @app.get("/")
 async def root():
@@ -56,34 +97,44 @@ async def health_check():
 
 @app.get("/api/user/profile")
 async def get_user_profile():
-    health_data = load_health_data()
-    return health_data["user"]
+    return health_section_response("user")
 
 @app.get("/api/health/blood-tests")
 async def get_blood_tests():
-    health_data = load_health_data()
-    return health_data["bloodTests"]
+    return health_section_response("bloodTests")
 
 @app.get("/api/health/vitals")
 async def get_vitals():
-    health_data = load_health_data()
-    return health_data["vitals"]
+    return health_section_response("vitals")
 
 @app.get("/api/health/medical-history")
 async def get_medical_history():
-    health_data = load_health_data()
-    return health_data["medicalHistory"]
+    return health_section_response("medicalHistory")
 
 @app.get("/api/health/metrics")
 async def get_health_metrics():
-    health_data = load_health_data()
-    return health_data["healthMetrics"]
-
-# Import the PinAI agent implementation
-from app.agent.health_agent import HealthAIAgent
-
-# Initialize the Health AI Agent
-health_agent = HealthAIAgent()
+    return health_section_response("healthMetrics")
+
+# The Health AI Agent (and the PinAI SDK behind it) is created on the first
+# chat request, so starting the API and serving the GET routes stay cheap
+_health_agent: Optional["HealthAIAgent"] = None
+_health_agent_lock = threading.Lock()
+
+def _create_health_agent() -> "HealthAIAgent":
+    global _health_agent
+    with _health_agent_lock:
+        if _health_agent is None:
+            # Import the PinAI agent implementation
+            from app.agent.health_agent import HealthAIAgent
+            
+            _health_agent = HealthAIAgent()
+    return _health_agent
+
+async def get_health_agent() -> "HealthAIAgent":
+    if _health_agent is not None:
+        return _health_agent
+    # Agent setup may register with PinAI over the network; keep it off the event loop
+    return await asyncio.to_thread(_create_health_agent)
 
 @app.post("/api/chat")
 async def chat(request: Dict[str, Any]):
@@ -98,14 +149,15 @@ async def chat(request: Dict[str, Any]):
         health_data = load_health_data()
         
         # Process the message using the Health AI Agent
-        response = health_agent.process_message(message, health_data, session_id)
+        health_agent = await get_health_agent()
+        response = await health_agent.process_message(message, health_data, session_id)
         
         return {
             "response": response,
             "session_id": session_id
         }
     except Exception as e:
-        logger.error(f"Error processing chat: {e}")
+        logger.error("Error processing chat: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Run with: uvicorn app.main:app --reload
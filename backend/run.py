@@ -9,6 +9,7 @@ load_dotenv()
 port = int(os.getenv("PORT", 8000))
 host = os.getenv("HOST", "0.0.0.0")
 debug = os.getenv("DEBUG", "true").lower() == "true"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
 
 if __name__ == "__main__":
     print(f"Starting Health AI Agent API on http://{host}:{port}")
@@ -18,5 +19,7 @@ if __name__ == "__main__":
         "app.main:app",
         host=host,
         port=port,
-        reload=debug
+        # uvicorn can't reload and run multiple workers at the same time
+        reload=debug and workers == 1,
+        workers=workers,
     ) 
\ No newline at end of file